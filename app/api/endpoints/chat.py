@@ -1,20 +1,83 @@
 # app/api/endpoints/chat.py
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import re
+import orjson
+from cachetools import TTLCache
 
-from app.core.rag_engine import rag_engine
+from app.config import settings
+from app.core.rag_engine import get_rag_engine
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Answers for repeated questions skip retrieval and Gemini entirely (per worker)
+_answer_cache: TTLCache = TTLCache(maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL)
+_WS_RE = re.compile(r"\s+")
+
+def clear_answer_cache() -> None:
+    """Drops cached /ask answers (call after re-ingesting documents)."""
+    _answer_cache.clear()
+
+def _cache_key(query: str, top_k: int) -> str:
+    normalized = _WS_RE.sub(" ", query.strip().lower())
+    return hashlib.sha256(f"{normalized}\x00{top_k}".encode("utf-8")).hexdigest()
+
 class ChatQuery(BaseModel):
     query: str
     top_k: Optional[int] = 5
+    stream: bool = False
+
+class ChatResponse(BaseModel):
+    answer: str
+
+async def _sse(events: AsyncIterator[Tuple[str, Dict]]) -> AsyncIterator[str]:
+    """Server-sent events: answer text as `message` events, then one `citations` event."""
+    try:
+        async for event, payload in events:
+            head = "" if event == "message" else f"event: {event}\n"
+            yield f"{head}data: {orjson.dumps(payload).decode()}\n\n"
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        yield f"event: error\ndata: {orjson.dumps({'detail': str(e)}).decode()}\n\n"
+
+def _stream_response(rag_engine, body: ChatQuery) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(rag_engine.stream_ask(body.query, top_k=body.top_k or 5)),
+        media_type="text/event-stream",
+    )
 
-@router.post("/ask")
-def ask_bank_bot(body: ChatQuery):
+@router.post("/stream")
+async def stream_bank_bot(body: ChatQuery):
+    """Same as /ask with "stream": true: the answer as server-sent events."""
+    try:
+        # First call builds the engine (models, index, BM25): keep it off the event loop
+        rag_engine = await asyncio.to_thread(get_rag_engine)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _stream_response(rag_engine, body)
+
+# response_model: FastAPI serializes the JSON answer with pydantic-core, not jsonable_encoder + json
+@router.post("/ask", response_model=ChatResponse)
+async def ask_bank_bot(body: ChatQuery):
+    try:
+        rag_engine = await asyncio.to_thread(get_rag_engine)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if body.stream:
+        return _stream_response(rag_engine, body)
+    top_k = body.top_k or 5
+    key = _cache_key(body.query, top_k)
+    cached = _answer_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        result = rag_engine.ask(body.query, top_k=body.top_k or 5)
-        return {"answer": result.get("answer", "I couldn’t find this in the provided documents.")}
+        result = await rag_engine.ask(body.query, top_k=top_k)
+        response = {"answer": result.get("answer", "I couldn’t find this in the provided documents.")}
+        _answer_cache[key] = response
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Tuple
+from functools import lru_cache
+import math
 
 router = APIRouter(prefix="/eligibility", tags=["eligibility"])
 
@@ -21,18 +23,22 @@ class EligibilityResponse(BaseModel):
     max_eligible_loan: float
     notes: list[str]
 
-def _emi_from_principal(P: float, annual_rate_pct: float, n_months: int) -> float:
+@lru_cache(maxsize=4096)
+def _monthly_rate_and_factor(annual_rate_pct: float, n_months: int) -> Tuple[float, float]:
+    """(r, (1+r)^n) with (1+r)^n = exp(n*log1p(r)); memoized since rate/tenure pairs repeat."""
     r = (annual_rate_pct / 100.0) / 12.0
+    return r, math.exp(n_months * math.log1p(r))
+
+def _emi_from_principal(P: float, annual_rate_pct: float, n_months: int) -> float:
+    r, factor = _monthly_rate_and_factor(annual_rate_pct, n_months)
     if r == 0:
         return P / n_months
-    factor = (1 + r) ** n_months
     return P * r * factor / (factor - 1)
 
 def _principal_from_emi(E: float, annual_rate_pct: float, n_months: int) -> float:
-    r = (annual_rate_pct / 100.0) / 12.0
+    r, factor = _monthly_rate_and_factor(annual_rate_pct, n_months)
     if r == 0:
         return E * n_months
-    factor = (1 + r) ** n_months
     return E * (factor - 1) / (r * factor)
 
 @router.post("/calculate", response_model=EligibilityResponse)
@@ -5,6 +5,8 @@ from typing import Optional
 
 
 from app.rag.ingest import ingest_directory
+from app.api.endpoints.chat import clear_answer_cache
+from app.core.rag_engine import peek_rag_engine
 from app.config import settings
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
@@ -17,6 +19,14 @@ def ingest(req: IngestRequest= Body(default=IngestRequest())):
     try:
         pdf_dir = req.path or "app/data/documents"
         result = ingest_directory(pdf_dir)
-        return {"status": "ok", "ingested": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    # Answers cached before this ingest may cite stale documents, and the re-rank
+    # vectors are keyed by positional ids. An engine that was never built has
+    # nothing loaded, so do not build one here.
+    clear_answer_cache()
+    engine = peek_rag_engine()
+    if engine is not None:
+        engine.clear_cache()
+        engine.reload_local_vecs()
+    return {"status": "ok", "ingested": result}
@@ -17,7 +17,10 @@ class Settings(BaseSettings):
     PINECONE_INDEX_NAME: str = "loan-support-v1"
     PINECONE_ENVIRONMENT: str = "us-west1-gcp-free"  # (kept for compat if you use old client)
     PINECONE_NAMESPACE: str = "default"              # <-- ADD THIS
+    PINECONE_EMBED_MODEL: Optional[str] = None       # e.g. "llama-text-embed-v2": Pinecone-hosted embedding (integrated index)
     SBERT_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"  # <-- ADD THIS
+    ONNX_EMBEDDER_DIR: Optional[str] = None  # int8 ONNX export of SBERT_MODEL_NAME (see README)
+    ONNX_NUM_THREADS: int = 0                # 0 = cores / WEB_CONCURRENCY intra-op threads per worker
     USE_LOCAL_FAISS: bool = True
 
     # Security
@@ -29,6 +32,17 @@ class Settings(BaseSettings):
     MAX_RETRIEVAL_DOCS: int = 5
     RETRIEVAL_TIMEOUT: float = 1.2
     LLM_TIMEOUT: float = 3.5
+    EMBED_BATCH_SIZE: int = 32
+    EMBED_BATCH_WINDOW_MS: float = 5.0  # micro-batch window for concurrent queries
+    EMBED_CACHE_SIZE: int = 2048
+    EMBED_CACHE_DIR: Optional[str] = None  # defaults to app/data/embeddings (one subdirectory per model)
+    EMBED_DISK_CACHE_SIZE: int = 50_000    # max cached query vectors on disk, oldest pruned first
+    LOCAL_RERANK: bool = False             # re-rank the hybrid shortlist by cosine on int8 chunk vectors
+    RERANK_CANDIDATES: int = 30
+    RESPONSE_CACHE_SIZE: int = 10_000      # /chat/ask answers, keyed by normalized query + top_k
+    RESPONSE_CACHE_TTL: int = 3600         # seconds
+    SEMANTIC_CACHE_SIZE: int = 10_000      # answers reused for near-duplicate questions (0 disables; unused with PINECONE_EMBED_MODEL; expire after RESPONSE_CACHE_TTL)
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95 # min cosine between question embeddings
 
     # PII Redaction
     MASK_PAN: bool = True
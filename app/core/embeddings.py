@@ -0,0 +1,353 @@
+# app/core/embeddings.py
+"""
+Embedding helpers shared by the RAG engine and the search adapters.
+- CachedEmbedder: LRU + bounded on-disk cache keyed on sha256(text) under a
+  per-model directory; misses are encoded together in one length-sorted batch.
+- EmbeddingBatcher: coalesces concurrent async embed requests into one
+  encode call (short time window or max batch size, whichever comes first).
+- OnnxEmbedder: int8-quantized ONNX Runtime drop-in for SentenceTransformer.
+- Int8EmbeddingStore: chunk vectors as int8 codes + per-vector scale, for
+  exact cosine re-ranking of a small candidate set without a vector DB call.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ------------------------- ONNX Runtime (int8) --------------------------
+
+def default_intra_op_threads() -> int:
+    """The cores split across worker processes (WEB_CONCURRENCY, set by gunicorn.conf.py)."""
+    try:
+        workers = max(int(os.getenv("WEB_CONCURRENCY") or 1), 1)
+    except ValueError:
+        workers = 1
+    return max((os.cpu_count() or 1) // workers, 1)
+
+class OnnxEmbedder:
+    """
+    Mean-pooled sentence embeddings from an ONNX export of the SBERT model,
+    matching SentenceTransformer.encode's signature so call sites stay unchanged.
+    `model_dir` holds `model-int8.onnx` plus tokenizer files (see export_int8_onnx).
+    """
+    def __init__(self, model_dir: str, model_file: str = "model-int8.onnx", max_length: int = 256, num_threads: int = 0):
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        self.model_path = os.path.join(model_dir, model_file)
+        self.num_threads = num_threads
+        self._new_session()
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._dim = int(self.session.get_outputs()[0].shape[-1])
+
+    def _new_session(self) -> None:
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = self.num_threads or default_intra_op_threads()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._pid = os.getpid()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dim
+
+    def encode(
+        self,
+        sentences,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        show_progress_bar: bool = False,
+        **_,
+    ):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        if self._pid != os.getpid():
+            # Forked worker (gunicorn --preload): ORT's thread pool does not survive fork
+            self._new_session()
+
+        out: List[np.ndarray] = []
+        for i in range(0, len(sentences), batch_size):
+            enc = self.tokenizer(
+                sentences[i:i + batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            emb = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                emb /= np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+            out.append(emb.astype(np.float32))
+
+        embs = np.vstack(out) if out else np.empty((0, self._dim), dtype=np.float32)
+        return embs[0] if single else embs
+
+
+def export_int8_onnx(model_name: str, out_dir: str) -> str:
+    """One-time export: HF checkpoint -> ONNX (optimum) -> dynamic int8 weights."""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoTokenizer
+
+    ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(out_dir)
+    quantize_dynamic(
+        os.path.join(out_dir, "model.onnx"),
+        os.path.join(out_dir, "model-int8.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+    return out_dir
+
+
+def load_embedder(model_name: str, onnx_dir: Optional[str] = None, num_threads: int = 0):
+    """int8 ONNX session when `onnx_dir` is set and usable, else SentenceTransformer."""
+    if onnx_dir:
+        try:
+            return OnnxEmbedder(onnx_dir, num_threads=num_threads)
+        except Exception as e:
+            print(f"[embeddings] ONNX embedder unavailable ({e}); using SentenceTransformer")
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def embedder_tag(model_name: str, model) -> str:
+    """Identifies the vectors a model produces: cached vectors are only reused under the same tag."""
+    return f"{model_name}@onnx-int8" if isinstance(model, OnnxEmbedder) else model_name
+
+
+class CachedEmbedder:
+    """
+    Wraps any model exposing SentenceTransformer's `encode(...)` signature.
+    Vectors are L2-normalized float32. Disk entries live at
+    `{cache_dir}/{model_tag}/{sha256}.npy`, so a restarted worker starts warm and
+    a model (or ONNX/PyTorch) switch never serves vectors from the old one.
+    The directory is capped at `disk_maxsize` files; the oldest are pruned first.
+    """
+    def __init__(
+        self,
+        model,
+        cache_dir: Optional[str] = None,
+        maxsize: int = 2048,
+        batch_size: int = 32,
+        model_tag: str = "default",
+        disk_maxsize: int = 50_000,
+    ):
+        self.model = model
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.disk_maxsize = disk_maxsize
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_dir = None
+        self._disk_count = 0
+        if cache_dir:
+            path = os.path.join(cache_dir, re.sub(r"[^\w.@-]+", "_", model_tag))
+            try:
+                os.makedirs(path, exist_ok=True)
+                self._disk_count = len(os.listdir(path))
+                self.cache_dir = path
+            except OSError:
+                # Best-effort like _persist: e.g. a read-only app filesystem runs memory-only
+                self._disk_count = 0
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        with self._lock:
+            self._lru[key] = vec
+            self._lru.move_to_end(key)
+            if len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def _persist(self, key: str, vec: np.ndarray) -> None:
+        if not self.cache_dir:
+            return
+        path = os.path.join(self.cache_dir, f"{key}.npy")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, vec, allow_pickle=False)
+            os.replace(tmp, path)
+        except OSError:
+            # Disk cache is best-effort; the in-memory LRU still holds the vector
+            return
+        with self._lock:
+            self._disk_count += 1
+            prune = self._disk_count > self.disk_maxsize
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        # Drop the oldest files down to 90% of the cap, so pruning stays infrequent
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".npy")]
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            excess = len(entries) - int(self.disk_maxsize * 0.9)
+            for e in entries[:max(excess, 0)]:
+                try:
+                    os.remove(e.path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_count = len(entries) - max(excess, 0)
+        except OSError:
+            pass
+
+    def lookup(self, text: str, key: Optional[str] = None, disk: bool = True) -> Optional[np.ndarray]:
+        """In-memory LRU, then (unless `disk=False`, e.g. on the event loop) the disk cache."""
+        key = key or text_key(text)
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                return vec
+        if disk and self.cache_dir:
+            path = os.path.join(self.cache_dir, f"{key}.npy")
+            if os.path.exists(path):
+                try:
+                    vec = np.load(path, allow_pickle=False)
+                except (OSError, ValueError):
+                    return None
+                self._remember(key, vec)
+                return vec
+        return None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        keys = [text_key(t) for t in texts]
+        out: List[Optional[np.ndarray]] = [self.lookup(t, k) for t, k in zip(texts, keys)]
+
+        # Encode each distinct miss once; length-sorted so batches carry little padding
+        todo: Dict[str, str] = {}
+        for t, k, v in zip(texts, keys, out):
+            if v is None:
+                todo.setdefault(k, t)
+        if todo:
+            pending: List[Tuple[str, str]] = sorted(todo.items(), key=lambda kv: len(kv[1]))
+            embs = self.model.encode(
+                [t for _, t in pending],
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            fresh: Dict[str, np.ndarray] = {}
+            for (k, _), v in zip(pending, embs):
+                v = np.asarray(v, dtype=np.float32)
+                fresh[k] = v
+                self._remember(k, v)
+                self._persist(k, v)
+            out = [v if v is not None else fresh[k] for k, v in zip(keys, out)]
+
+        if not out:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(out)
+
+
+class EmbeddingBatcher:
+    """
+    asyncio micro-batcher: the first queued text opens a window of `window_ms`;
+    everything that arrives before it closes (up to `max_batch`) is encoded in
+    a single call on a worker thread, then results are fanned back out.
+    """
+    def __init__(self, embedder: CachedEmbedder, max_batch: int = 32, window_ms: float = 5.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        # Memory only here: disk hits are resolved by encode() on the worker thread
+        cached = self.embedder.lookup(text, disk=False)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        fut = loop.create_future()
+        self._queue.put_nowait((text, fut))
+        return await fut
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                embs = await asyncio.to_thread(self.embedder.encode, [t for t, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), v in zip(batch, embs):
+                if not fut.done():
+                    fut.set_result(v)
+
+
+# ------------------------ int8 chunk embeddings -------------------------
+
+def quantize_int8(vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 of the L2-normalized rows: row ~= codes * scale."""
+    vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+    scales = np.abs(vecs).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.round(vecs / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class Int8EmbeddingStore:
+    def __init__(self, ids: List[str], codes: np.ndarray, scales: np.ndarray):
+        self.codes = codes
+        self.scales = scales
+        self.id_to_row = {cid: i for i, cid in enumerate(ids)}
+
+    @staticmethod
+    def save(path: str, ids: List[str], vecs) -> None:
+        codes, scales = quantize_int8(np.asarray(vecs, dtype=np.float32))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, ids=np.asarray(ids, dtype=str), codes=codes, scales=scales)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Int8EmbeddingStore":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["ids"].tolist(), data["codes"], data["scales"])
+
+    def cosine(self, query_vec, ids: List[str]) -> Dict[str, float]:
+        """Cosine of the query against each known id (unknown ids are left out)."""
+        rows = [(cid, self.id_to_row[cid]) for cid in ids if cid in self.id_to_row]
+        if not rows:
+            return {}
+        idx = np.fromiter((r for _, r in rows), dtype=np.int64, count=len(rows))
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        sims = (self.codes[idx].astype(np.float32) @ q) * self.scales[idx]
+        return {cid: float(s) for (cid, _), s in zip(rows, sims)}
@@ -0,0 +1,18 @@
+# app/core/genai.py
+"""Process-wide Gemini SDK setup, free of import-time side effects."""
+import threading
+
+_genai_configured = False
+_genai_lock = threading.Lock()
+
+def configure_genai(api_key: str) -> None:
+    """Configure the Gemini SDK once per process (shared by GeminiClient and the RAG engine)"""
+    global _genai_configured
+    if _genai_configured:
+        return
+    with _genai_lock:
+        if not _genai_configured:
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            _genai_configured = True
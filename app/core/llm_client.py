@@ -1,10 +1,27 @@
 import asyncio
 import time
+import re
 from typing import List, Dict, Any, Optional
 from app.config import settings
+from app.core.genai import configure_genai
 from app.core.security import redactor
 import json
 
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+# Mock intents in priority order (first matching intent wins). Substring matches are
+# intended: "documentation" -> documentation, "rates"/"interested" -> rates.
+_MOCK_INTENTS = (
+    ("eligibility", ("eligible", "income")),
+    ("documentation", ("document", "papers")),
+    ("rates", ("rate", "interest")),
+)
+_MOCK_KEYWORD_RE = re.compile("|".join(kw for _, kws in _MOCK_INTENTS for kw in kws), re.I)
+_MOCK_KEYWORD_INTENT = {kw: intent for intent, kws in _MOCK_INTENTS for kw in kws}
+
 class MockLLMClient:
     """Mock LLM client for development when Gemini is not available"""
     
@@ -29,16 +46,10 @@ class MockLLMClient:
         # Simulate processing delay
         await asyncio.sleep(0.1)
         
-        # Simple keyword matching for mock responses
-        query_lower = query.lower()
-        if "eligible" in query_lower or "income" in query_lower:
-            response = self.mock_responses["eligibility"]
-        elif "document" in query_lower or "papers" in query_lower:
-            response = self.mock_responses["documentation"] 
-        elif "rate" in query_lower or "interest" in query_lower:
-            response = self.mock_responses["rates"]
-        else:
-            response = self.mock_responses["default"]
+        # Simple keyword matching for mock responses (one regex pass over the query)
+        found = {_MOCK_KEYWORD_INTENT[m.lower()] for m in _MOCK_KEYWORD_RE.findall(query)}
+        intent = next((name for name, _ in _MOCK_INTENTS if name in found), "default")
+        response = self.mock_responses[intent]
         
         # Add context information if available
         if context_docs:
@@ -63,12 +74,11 @@ class GeminiClient:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not provided")
         
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=self.api_key)
+        if genai is not None:
+            configure_genai(self.api_key)
             self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
             self.available = True
-        except ImportError:
+        else:
             self.available = False
         
     async def generate_response(
@@ -126,9 +136,11 @@ IMPORTANT RULES:
 6. Keep responses concise but complete"""
 
         if context_docs:
-            context_text = "\n\nRELEVANT DOCUMENTS:\n"
-            for i, doc in enumerate(context_docs, 1):
-                context_text += f"[{i}] {doc.get('title', 'Document')}: {doc.get('content', '')}\n"
+            # One join instead of re-copying the growing string for every document
+            context_text = "\n\nRELEVANT DOCUMENTS:\n" + "".join(
+                f"[{i}] {doc.get('title', 'Document')}: {doc.get('content', '')}\n"
+                for i, doc in enumerate(context_docs, 1)
+            )
             prompt = f"{base_prompt}\n{context_text}\n\nQUERY: {query}\n\nRESPONSE:"
         else:
             prompt = f"{base_prompt}\n\nQUERY: {query}\n\nRESPONSE:"
@@ -137,11 +149,12 @@ IMPORTANT RULES:
     
     async def _generate_async(self, prompt: str) -> str:
         """Async wrapper for generation"""
-        response = self.model.generate_content(prompt)
+        response = await self.model.generate_content_async(prompt)
         return response.text
 
 # Use mock client by default, can switch to real Gemini when API key is provided
 try:
     llm_client = GeminiClient() if settings.GEMINI_API_KEY else MockLLMClient()
-except:
+except Exception as e:
+    print(f"[llm] Gemini client unavailable, using mock: {e}")
     llm_client = MockLLMClient()
\ No newline at end of file
@@ -1,20 +1,29 @@
 # app/core/rag_engine.py
 from __future__ import annotations
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple, Union
 from dataclasses import dataclass
+from itertools import islice
+from operator import itemgetter
+import asyncio
+import io
 import os
-import pickle
 import re
+import threading
+import time
 
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
-from rank_bm25 import BM25Okapi
+import numpy as np
 import google.generativeai as genai
 
 from app.config import settings
+from app.core.embeddings import CachedEmbedder, EmbeddingBatcher, Int8EmbeddingStore, embedder_tag, load_embedder
+from app.core.genai import configure_genai
+from app.core.security import redactor
+from app.search.hybrid_search import BM25LexicalIndex, bm25_index_available, reciprocal_rank_fusion
 
 
-@dataclass
+# Immutable, __dict__-free record (slots needs Python 3.10+, see README)
+@dataclass(slots=True, frozen=True)
 class SearchHit:
     text: str
     score: float
@@ -23,232 +32,371 @@ class SearchHit:
     page: int
 
 
-# ---------------------------- Lexical (BM25) ----------------------------
+# ---------------------------- RAG Engine --------------------------------
 
-def _simple_tokenize(text: str) -> List[str]:
-    return re.findall(r"\w+", (text or "").lower())
+NOT_FOUND_ANSWER = "I couldn’t find this in the provided documents."
 
-class BM25LexicalIndex:
-    """
-    Loads a persisted lexical index built at ingest time.
-    Expected pickle schema:
-      {"chunks": [{"id": str, "text": str, "metadata": {...}}, ...],
-       "doc_tokens": List[List[str]]}
-    """
-    def __init__(self, persist_path: str):
-        self.persist_path = persist_path
-        self.bm25: Optional[BM25Okapi] = None
-        self.chunks: List[Dict] = []
-        self.id_to_idx: Dict[str, int] = {}
-
-    def available(self) -> bool:
-        return os.path.exists(self.persist_path)
-
-    def load(self) -> None:
-        with open(self.persist_path, "rb") as f:
-            data = pickle.load(f)
-        self.chunks = data["chunks"]
-        doc_tokens = data["doc_tokens"]
-        self.bm25 = BM25Okapi(doc_tokens)
-        self.id_to_idx = {c["id"]: i for i, c in enumerate(self.chunks)}
-
-    def search(self, query: str, top_k: int = 50) -> List[Tuple[str, float]]:
-        if not self.bm25:
-            return []
-        scores = self.bm25.get_scores(_simple_tokenize(query))
-        idxs = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
-        return [(self.chunks[i]["id"], float(scores[i])) for i in idxs]
-
-    def chunk_by_id(self, cid: str) -> Optional[Dict]:
-        i = self.id_to_idx.get(cid)
-        return self.chunks[i] if i is not None else None
-
-
-# ----------------------- Reciprocal Rank Fusion -------------------------
-
-def reciprocal_rank_fusion(
-    lists: List[List[Tuple[str, float]]],
-    kappa: int = 60,
-    top_k: int = 10
-) -> List[Tuple[str, float]]:
-    ranks: List[Dict[str, int]] = []
-    for L in lists:
-        ranks.append({cid: r for r, (cid, _) in enumerate(L, start=1)})
-
-    all_ids = set()
-    for L in lists:
-        all_ids.update([cid for cid, _ in L])
-
-    fused: Dict[str, float] = {}
-    for cid in all_ids:
-        score = 0.0
-        for rm in ranks:
-            if cid in rm:
-                score += 1.0 / (kappa + rm[cid])
-        fused[cid] = score
-
-    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s)|\n")
 
+def _split_at_sentence_end(text: str) -> Tuple[str, str]:
+    """Splits after the last sentence boundary: (complete sentences, remainder)."""
+    last = None
+    for last in _SENTENCE_END_RE.finditer(text):
+        pass
+    if last is None:
+        return "", text
+    return text[:last.end()], text[last.end():]
+
+# Static answer rules, sent as the model's system instruction ahead of the dynamic
+# QUESTION/CONTEXT. Kept byte-identical across calls so the prefix is cacheable.
+SYSTEM_INSTRUCTION = """
+You are a helpful, precise assistant. Answer only using the CONTEXT below.
+If something is not stated in the context, say: "Not specified in the provided documents."
+Do not invent banks, figures, policies, dates, or fees.
+
+Formatting rules:
+- No code fences, no JSON, no markdown backticks.
+- Use short paragraphs and bullet points.
+- If multiple banks appear, show bank-wise bullets like: "• Axis Bank: …"
+- Write numbers with units (e.g., 9.65% p.a., ₹10,000 + GST).
+- Keep it concise and clear for a layperson; add a one-line summary at the end.
+""".strip()
 
-# ---------------------------- RAG Engine --------------------------------
+
+class SemanticAnswerCache:
+    """
+    Past answers keyed by their (L2-normalized) question embedding: a new question
+    with cosine >= threshold against a cached one, asked with the same top_k, reuses
+    its answer. Rows live in one preallocated matrix; when full, an expired row or else
+    the least recently used one is overwritten. Rows expire `ttl` seconds after being
+    written, so workers that did not serve /ingest stop answering from old documents.
+    """
+    def __init__(self, maxsize: int, threshold: float, ttl: float):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vecs: Optional[np.ndarray] = None        # (maxsize, dim), allocated on first put
+        self._top_ks = np.zeros(maxsize, dtype=np.int32)
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._expires = np.zeros(maxsize, dtype=np.float64)   # time.monotonic() deadline per row
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * maxsize
+        self._size = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def get(self, q: np.ndarray, top_k: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._size:
+                return None
+            sims = self._vecs[:self._size] @ q
+            sims[self._top_ks[:self._size] != top_k] = -1.0
+            sims[self._expires[:self._size] <= time.monotonic()] = -1.0
+            i = int(np.argmax(sims))
+            if sims[i] < self.threshold:
+                return None
+            self._tick += 1
+            self._last_used[i] = self._tick
+            return self._entries[i]
+
+    def put(self, q: np.ndarray, top_k: int, answer: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._vecs is None:
+                self._vecs = np.zeros((self.maxsize, q.shape[0]), dtype=np.float32)
+            if self._size < self.maxsize:
+                i = self._size
+                self._size += 1
+            else:
+                now = time.monotonic()
+                i = int(np.argmin(np.where(self._expires <= now, -1, self._last_used)))
+            self._tick += 1
+            self._vecs[i] = q
+            self._top_ks[i] = top_k
+            self._last_used[i] = self._tick
+            self._expires[i] = time.monotonic() + self.ttl
+            self._entries[i] = answer
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = [None] * self.maxsize
+            self._size = 0
 
 class PineconeRAGEngine:
     def __init__(self):
-        # Pinecone / Embeddings
+        # Both keys up front, before any model or index is loaded
         if not settings.PINECONE_API_KEY:
             raise RuntimeError("PINECONE_API_KEY not set")
+        if not settings.GEMINI_API_KEY:
+            raise RuntimeError("GEMINI_API_KEY not set")
+
+        # Pinecone / Embeddings
         self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
         self.index_name = getattr(settings, "PINECONE_INDEX_NAME", "loan-docs")
         self.namespace = getattr(settings, "PINECONE_NAMESPACE", "default")
         self.model_name = getattr(settings, "SBERT_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
-        self.embedder = SentenceTransformer(self.model_name)
+        self.embedder = load_embedder(self.model_name, settings.ONNX_EMBEDDER_DIR, settings.ONNX_NUM_THREADS)
         self.index = self.pc.Index(self.index_name)
+        # Integrated index: Pinecone embeds the query server-side, one RPC per search
+        self.integrated_embed = bool(settings.PINECONE_EMBED_MODEL)
+
+        # Query embeddings: sha256-keyed LRU (+ disk) cache, micro-batched for async callers
+        data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+        self.embeddings = CachedEmbedder(
+            self.embedder,
+            cache_dir=settings.EMBED_CACHE_DIR or os.path.join(data_dir, "embeddings"),
+            maxsize=settings.EMBED_CACHE_SIZE,
+            batch_size=settings.EMBED_BATCH_SIZE,
+            model_tag=embedder_tag(self.model_name, self.embedder),
+            disk_maxsize=settings.EMBED_DISK_CACHE_SIZE,
+        )
+        self.batcher = EmbeddingBatcher(
+            self.embeddings,
+            max_batch=settings.EMBED_BATCH_SIZE,
+            window_ms=settings.EMBED_BATCH_WINDOW_MS,
+        )
+        # Near-duplicate questions reuse an earlier answer (SEMANTIC_CACHE_SIZE=0 disables).
+        # Off for integrated indexes: it would put the local embedder back on every request.
+        self.answer_cache: Optional[SemanticAnswerCache] = (
+            SemanticAnswerCache(settings.SEMANTIC_CACHE_SIZE, settings.SEMANTIC_CACHE_THRESHOLD, settings.RESPONSE_CACHE_TTL)
+            if settings.SEMANTIC_CACHE_SIZE > 0 and not self.integrated_embed else None
+        )
 
         # Gemini LLM
-        if not settings.GEMINI_API_KEY:
-            raise RuntimeError("GEMINI_API_KEY not set")
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+        configure_genai(settings.GEMINI_API_KEY)
+        self.generation_config = {"temperature": 0.4, "top_p": 0.9, "max_output_tokens": 600}
+        # Rules go in the system-instruction field: a byte-identical prefix ahead of every request
         self.model = genai.GenerativeModel(
             settings.GEMINI_MODEL or "gemini-1.5-flash",
-            generation_config={"temperature": 0.4, "top_p": 0.9, "max_output_tokens": 600},
+            generation_config=self.generation_config,
+            system_instruction=SYSTEM_INSTRUCTION,
         )
 
         # Optional BM25 (Hybrid)
         # This file is written by ingest (register_chunks) if you followed earlier step.
-        bm25_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "bm25_lex.pkl"))
-        self.lex: Optional[BM25LexicalIndex] = BM25LexicalIndex(bm25_path)
-        if self.lex.available():
+        # Same index and Okapi BM25 scorer as app.search.hybrid_search (arrays memory-mapped)
+        bm25_path = os.path.join(data_dir, "bm25_lex")
+        self.lex: Optional[BM25LexicalIndex] = None
+        if bm25_index_available(bm25_path):
             try:
-                self.lex.load()
+                self.lex = BM25LexicalIndex()
+                self.lex.load(bm25_path)
             except Exception:
                 # If loading fails, continue with semantic-only
                 self.lex = None
 
+        # Optional int8 chunk vectors (written by ingest) to re-rank the fused shortlist
+        self.vecs_path = os.path.join(data_dir, "chunk_vecs_int8.npz")
+        self.local_vecs: Optional[Int8EmbeddingStore] = None
+        self.reload_local_vecs()
+
+    def reload_local_vecs(self) -> None:
+        """(Re)reads the int8 chunk vectors; call after ingest, since vector ids are positional."""
+        store = None
+        if settings.LOCAL_RERANK and not self.integrated_embed and os.path.exists(self.vecs_path):
+            try:
+                store = Int8EmbeddingStore.load(self.vecs_path)
+            except Exception:
+                store = None
+        self.local_vecs = store
+
     # --- Embeddings ---
-    def embed(self, text: str):
-        return self.embedder.encode(text).tolist()
+    def embed(self, texts: Union[str, List[str]]):
+        """One vector for a str, a list of vectors for a list of str."""
+        if isinstance(texts, str):
+            return self.embeddings.encode([texts])[0].tolist()
+        return self.embeddings.encode(list(texts)).tolist()
+
+    async def aembed(self, text: str) -> List[float]:
+        """Async single-text embed; concurrent callers share one encode batch."""
+        return (await self.batcher.embed(text)).tolist()
 
     # --- Retrieval (Hybrid when possible) ---
-    def _retrieve_semantic(self, query: str, top_k: int) -> List[Tuple[str, float, Dict]]:
-        q = self.embed(query)
-        res = self.index.query(
+    def _search_records(self, query: str, top_k: int) -> Dict[str, Tuple[float, Dict]]:
+        res = self.index.search(
+            namespace=self.namespace,
+            query={"top_k": top_k, "inputs": {"text": query}},
+        )
+        return {
+            hit["_id"]: (float(hit["_score"] or 0.0), dict(hit["fields"] or {}))
+            for hit in res["result"]["hits"]
+        }
+
+    async def _retrieve_semantic(self, query: str, top_k: int) -> Dict[str, Tuple[float, Dict]]:
+        # id -> (score, metadata), in rank order (dicts keep insertion order)
+        if self.integrated_embed:
+            return await asyncio.to_thread(self._search_records, query, max(top_k, 20))
+        q = await self.aembed(query)
+        res = await asyncio.to_thread(
+            self.index.query,
             namespace=self.namespace,
             vector=q,
             top_k=max(top_k, 20),   # slightly larger pool for fusion
             include_metadata=True
         )
-        out: List[Tuple[str, float, Dict]] = []
-        for m in res.matches or []:
-            meta = m.metadata or {}
-            out.append((m.id, float(m.score or 0.0), meta))
-        return out
+        return {m.id: (float(m.score or 0.0), m.metadata or {}) for m in res.matches or []}
 
-    def _retrieve_lexical(self, query: str, top_k: int) -> List[Tuple[str, float, Dict]]:
+    async def _retrieve_lexical(self, query: str, top_k: int) -> Dict[str, Tuple[float, Dict]]:
         if not self.lex:
-            return []
-        hits = self.lex.search(query, top_k=max(top_k, 50))
+            return {}
+        hits = await asyncio.to_thread(self.lex.search, query, top_k=max(top_k, 50))
         # Map ids to metadata via chunk store
-        out: List[Tuple[str, float, Dict]] = []
+        out: Dict[str, Tuple[float, Dict]] = {}
         for cid, s in hits:
-            ch = self.lex.chunk_by_id(cid) or {}
-            meta = ch.get("metadata", {})
-            # Ensure "text" in meta for synthesis (if persisted that way)
+            ch = self.lex.chunk_by_id(cid)
+            meta = ch.metadata if ch else {}
+            # Ensure "text" in meta for synthesis (without mutating the stored chunk)
             if "text" not in meta:
-                meta["text"] = ch.get("text", "")
-            out.append((cid, s, meta))
+                meta = {**meta, "text": ch.text if ch else ""}
+            out[cid] = (s, meta)
         return out
 
-    def retrieve(self, query: str, top_k: int = 6) -> List[SearchHit]:
+    def _rerank_local(self, query_vec: List[float], fused: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        cos = self.local_vecs.cosine(query_vec, [cid for cid, _ in fused])
+        known = sorted(((cid, cos[cid]) for cid, _ in fused if cid in cos), key=itemgetter(1), reverse=True)
+        # Ids without a local vector keep their fused order after the re-ranked ones
+        return known + [(cid, s) for cid, s in fused if cid not in cos]
+
+    @staticmethod
+    def _hit(meta: Dict, score: float) -> SearchHit:
+        return SearchHit(
+            text=meta.get("text", ""),
+            score=float(score),
+            bank=meta.get("bank", "Unknown"),
+            source=meta.get("source", ""),
+            page=int(meta.get("page", 0)),
+        )
+
+    async def retrieve(self, query: str, top_k: int = 6) -> List[SearchHit]:
         # If we have BM25 index, do Hybrid (RRF); else semantic-only
-        sem = self._retrieve_semantic(query, top_k)
         if self.lex:
-            lex = self._retrieve_lexical(query, top_k)
-            # Prepare ranked lists of (id, score) for fusion
-            sem_rank = [(cid, s) for (cid, s, _) in sem]
-            lex_rank = [(cid, s) for (cid, s, _) in lex]
-            fused = reciprocal_rank_fusion([sem_rank, lex_rank], kappa=60, top_k=top_k)
-
-            # Build final hits using metadata from whichever side we have
-            meta_by_id: Dict[str, Dict] = {}
-            for cid, _, meta in sem:
-                meta_by_id[cid] = meta
-            for cid, _, meta in lex:
-                meta_by_id.setdefault(cid, meta)
-
-            hits: List[SearchHit] = []
-            for cid, fscore in fused:
-                meta = meta_by_id.get(cid, {})
-                hits.append(SearchHit(
-                    text=meta.get("text", ""),
-                    score=float(fscore),
-                    bank=meta.get("bank", "Unknown"),
-                    source=meta.get("source", ""),
-                    page=int(meta.get("page", 0)),
-                ))
-            return hits
+            # Pinecone round-trip and BM25 scoring are independent: run them concurrently
+            sem, lex = await asyncio.gather(
+                self._retrieve_semantic(query, top_k),
+                self._retrieve_lexical(query, top_k),
+            )
+            # Fusion only reads ids in rank order, so the maps' items() feed it directly
+            if self.local_vecs is not None:
+                # Fuse a wider shortlist, then order it by exact cosine on local int8 vectors
+                fused = reciprocal_rank_fusion([sem.items(), lex.items()], kappa=60, top_k=max(top_k, settings.RERANK_CANDIDATES))
+                fused = self._rerank_local(await self.aembed(query), fused)[:top_k]
+            else:
+                fused = reciprocal_rank_fusion([sem.items(), lex.items()], kappa=60, top_k=top_k)
+
+            # Metadata from whichever side has the id (semantic first)
+            return [
+                self._hit((sem.get(cid) or lex.get(cid) or (0.0, {}))[1], fscore)
+                for cid, fscore in fused
+            ]
 
         # Semantic-only fallback (original behavior)
-        hits: List[SearchHit] = []
-        for cid, s, meta in sem[:top_k]:
-            hits.append(SearchHit(
-                text=meta.get("text", ""),
-                score=float(s),
-                bank=meta.get("bank", "Unknown"),
-                source=meta.get("source", ""),
-                page=int(meta.get("page", 0)),
-            ))
-        return hits
+        sem = await self._retrieve_semantic(query, top_k)
+        return [self._hit(meta, s) for s, meta in islice(sem.values(), top_k)]
 
     # --- Synthesis (unchanged answer shape) ---
-    def synthesize(self, question: str, hits: List[SearchHit]) -> Dict[str, Any]:
-        # Build compact grounded context
-        context_blocks = []
+    @staticmethod
+    def _build_prompt(question: str, hits: List[SearchHit]) -> str:
+        """QUESTION + CONTEXT only; SYSTEM_INSTRUCTION rides on the model."""
+        # Build compact grounded context, written straight into one buffer
+        buf = io.StringIO()
+        buf.write("QUESTION:\n")
+        buf.write(question)
+        buf.write("\n\nCONTEXT:")
+        blocks = 0
         for h in hits:
-            if h.text.strip():
-                context_blocks.append(f"[{h.bank} | p{h.page}]\n{h.text}")
-            if len(context_blocks) >= 8:
+            if not h.text.strip():
+                continue
+            buf.write(f"\n[{h.bank} | p{h.page}]\n")
+            buf.write(h.text)
+            blocks += 1
+            if blocks == 8:
                 break
 
-        prompt = f"""
-You are a helpful, precise assistant. Answer only using the CONTEXT below.
-If something is not stated in the context, say: "Not specified in the provided documents."
-Do not invent banks, figures, policies, dates, or fees.
-
-Formatting rules:
-- No code fences, no JSON, no markdown backticks.
-- Use short paragraphs and bullet points.
-- If multiple banks appear, show bank-wise bullets like: "• Axis Bank: …"
-- Write numbers with units (e.g., 9.65% p.a., ₹10,000 + GST).
-- Keep it concise and clear for a layperson; add a one-line summary at the end.
-
-QUESTION:
-{question}
-
-CONTEXT:
-{chr(10).join(context_blocks)}
-""".strip()
-
-        resp = self.model.generate_content(prompt)
-        text = (resp.text or "").strip() if resp else ""
-
-        if not text:
-            text = "I couldn’t find this in the provided documents."
+        return buf.getvalue().rstrip()
 
+    @staticmethod
+    def _sources(hits: List[SearchHit]) -> Dict[str, Any]:
         return {
-            "answer": text,
             "banks": [{"name": h.bank, "confidence": h.score} for h in hits],
             "citations": [{"bank": h.bank, "page": h.page, "score": h.score, "source": h.source} for h in hits],
         }
 
-    def ask(self, question: str, top_k: int = 6) -> Dict[str, Any]:
-        hits = self.retrieve(question, top_k=top_k)
+    async def synthesize(self, question: str, hits: List[SearchHit]) -> Dict[str, Any]:
+        resp = await self.model.generate_content_async(self._build_prompt(question, hits))
+        text = (resp.text or "").strip() if resp else ""
+
+        if not text:
+            text = NOT_FOUND_ANSWER
+
+        # Same PII masking as the streamed answer
+        return {"answer": redactor.redact_text(text), **self._sources(hits)}
+
+    def clear_cache(self) -> None:
+        """Drops cached answers (call after re-ingesting documents)."""
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+
+    async def ask(self, question: str, top_k: int = 6) -> Dict[str, Any]:
+        q_vec = None
+        if self.answer_cache is not None:
+            # Same batcher/LRU as retrieval, so the semantic leg reuses this vector
+            q_vec = await self.batcher.embed(question)
+            cached = self.answer_cache.get(q_vec, top_k)
+            if cached is not None:
+                return dict(cached)
+
+        hits = await self.retrieve(question, top_k=top_k)
         if not hits:
-            return {"answer": "I couldn’t find this in the provided documents.", "banks": [], "citations": []}
-        out = self.synthesize(question, hits)
+            return {"answer": NOT_FOUND_ANSWER, "banks": [], "citations": []}
+        out = await self.synthesize(question, hits)
         if "citations" not in out:
             out["citations"] = [{"bank": h.bank, "page": h.page, "score": h.score, "source": h.source} for h in hits]
+        if q_vec is not None:
+            self.answer_cache.put(q_vec, top_k, dict(out))
         return out
 
+    async def stream_ask(self, question: str, top_k: int = 6) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streams the answer as ("message", {"text": ...}) events, flushed on sentence
+        boundaries so each piece can be PII-redacted whole, then one
+        ("citations", {"banks": [...], "citations": [...]}) event.
+        """
+        hits = await self.retrieve(question, top_k=top_k)
+        if not hits:
+            yield "message", {"text": NOT_FOUND_ANSWER}
+            yield "citations", {"banks": [], "citations": []}
+            return
 
-# Singleton
-rag_engine = PineconeRAGEngine()
+        resp = await self.model.generate_content_async(self._build_prompt(question, hits), stream=True)
+        pending, sent = "", False
+        async for chunk in resp:
+            try:
+                pending += chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. a safety stop)
+                continue
+            ready, pending = _split_at_sentence_end(pending)
+            if ready:
+                sent = True
+                yield "message", {"text": redactor.redact_text(ready)}
+        if pending.strip():
+            sent = True
+            yield "message", {"text": redactor.redact_text(pending)}
+        if not sent:
+            yield "message", {"text": NOT_FOUND_ANSWER}
+        yield "citations", self._sources(hits)
+
+
+# Singleton, built on first use (or by the app/gunicorn warm-up) rather than at import
+_rag_engine: Optional[PineconeRAGEngine] = None
+_rag_lock = threading.Lock()
+
+def get_rag_engine() -> PineconeRAGEngine:
+    global _rag_engine
+    if _rag_engine is None:
+        with _rag_lock:
+            if _rag_engine is None:
+                _rag_engine = PineconeRAGEngine()
+    return _rag_engine
+
+def peek_rag_engine() -> Optional[PineconeRAGEngine]:
+    """The engine if it has already been built; never builds it."""
+    return _rag_engine
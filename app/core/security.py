@@ -1,10 +1,58 @@
 import re
 
+from app.config import settings
+
+# PAN: AAAAA9999A. Aadhaar: 12 digits (never starting 0/1), optionally grouped 4-4-4,
+# and only if the last digit is a valid Verhoeff check digit (amounts are left alone).
+_PII_PATTERNS = {
+    "PAN": r"\b[A-Z]{5}[0-9]{4}[A-Z]\b",
+    "AADHAAR": r"\b[2-9][0-9]{3}[ -]?[0-9]{4}[ -]?[0-9]{4}\b",
+}
+
+# Verhoeff tables: dihedral group D5 multiplication and the position permutation
+_VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6), (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8), (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2), (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4), (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+_VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2), (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 8, 7, 0, 6), (4, 2, 8, 6, 5, 7, 0, 3, 9, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5), (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+def verhoeff_valid(digits: str) -> bool:
+    """True if the trailing digit is the Verhoeff check digit of the rest."""
+    c = 0
+    for i, ch in enumerate(reversed(digits)):
+        c = _VERHOEFF_D[c][_VERHOEFF_P[i % 8][int(ch)]]
+    return c == 0
+
 class PIIRedactor:
+    def __init__(self):
+        enabled = [name for name, on in (("PAN", settings.MASK_PAN), ("AADHAAR", settings.MASK_AADHAAR)) if on]
+        # Every enabled pattern in one alternation: a single scan per text, whatever the count
+        self._pattern = (
+            re.compile("|".join(f"(?P<{name}>{_PII_PATTERNS[name]})" for name in enabled))
+            if enabled else None
+        )
+
+    @staticmethod
+    def _is_pii(m: re.Match) -> bool:
+        if m.lastgroup == "AADHAAR":
+            return verhoeff_valid(re.sub(r"[ -]", "", m.group(0)))
+        return True
+
     def redact_text(self, text: str) -> str:
-        return text
+        if not self._pattern or not text:
+            return text
+        return self._pattern.sub(lambda m: f"[{m.lastgroup} REDACTED]" if self._is_pii(m) else m.group(0), text)
+
     def contains_pii(self, text: str) -> bool:
-        return False
+        return bool(self._pattern and text and any(self._is_pii(m) for m in self._pattern.finditer(text)))
 
 def verify_bearer_token(token: str) -> bool:
     return True
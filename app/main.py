@@ -4,7 +4,9 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
 from app.config import settings
 from app.api.endpoints import chat, eligibility, ingest
+from app.core.rag_engine import get_rag_engine
 from app.core.security import verify_bearer_token
+import asyncio
 import time
 
 # Security
@@ -22,6 +24,11 @@ async def lifespan(app: FastAPI):
     print(f"🚀 Starting {settings.PROJECT_NAME}")
     print(f"🔧 API Version: {settings.API_VERSION}")
     print(f"🌐 Environment: {'Development' if settings.USE_LOCAL_FAISS else 'Production'}")
+    try:
+        # Build the RAG engine before the first request (no-op if gunicorn already did)
+        await asyncio.to_thread(get_rag_engine)
+    except Exception as e:
+        print(f"⚠️ RAG engine not ready, /chat will report errors: {e}")
     yield
     print("🛑 Shutting down application")
 
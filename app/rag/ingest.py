@@ -1,48 +1,36 @@
 
 import os
+import multiprocessing
+import numpy as np
 from typing import List, Dict
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from PyPDF2 import PdfReader
 from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 
 from app.config import settings
+from app.core.embeddings import Int8EmbeddingStore
+from app.rag.pdf_text import extract_pdf_pages
 from app.services.retrieval import register_chunks
 
+# int8 chunk vectors for the engine's local re-rank (LOCAL_RERANK)
+INT8_EMBEDDINGS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "chunk_vecs_int8.npz"))
+
 def load_pdfs(pdf_dir: str) -> List[Dict]:
     """Load PDFs and return list of dicts with text per page."""
-    docs = []
-    for path in Path(pdf_dir).glob("*.pdf"):
-        try:
-            reader = PdfReader(str(path))
-            for i, page in enumerate(reader.pages):
-                text = page.extract_text() or ""
-                if not text.strip():
-                    continue
-                bank = infer_bank_from_name(path.name)
-                docs.append({
-                    "content": text,
-                    "metadata": {
-                        "source": str(path),
-                        "page": i + 1,
-                        "bank": bank,
-                        "title": path.stem,
-                    }
-                })
-        except Exception as e:
-            print(f"[ingest] Failed to read {path}: {e}")
-    return docs
-
-def infer_bank_from_name(filename: str) -> str:
-    lower = filename.lower()
-    if "axis" in lower: return "Axis Bank"
-    if "sbi" in lower or "state bank" in lower: return "State Bank of India"
-    if "hdfc" in lower: return "HDFC Bank"
-    if "icici" in lower: return "ICICI Bank"
-    if "kotak" in lower: return "Kotak Mahindra Bank"
-    return "Unknown"
+    paths = [str(p) for p in Path(pdf_dir).glob("*.pdf")]
+    if not paths:
+        return []
+    if len(paths) == 1:
+        return extract_pdf_pages(paths[0])
+    # extract_text is pure-Python and CPU-bound: one PDF per process. Spawn, not fork:
+    # this runs inside the threaded API server, and forking it can copy held locks.
+    # Workers unpickle from app.rag.pdf_text, which imports only PyPDF2.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1), mp_context=ctx) as ex:
+        return [doc for docs in ex.map(extract_pdf_pages, paths) for doc in docs]
 
 def chunk_docs(docs: List[Dict]) -> List[Dict]:
     splitter = RecursiveCharacterTextSplitter(
@@ -64,10 +52,58 @@ def ensure_index(pc: Pinecone, index_name: str, dim: int):
         pc.create_index(
             name=index_name,
             dimension=dim,
-            metric="cosine",
+            metric="dotproduct",  # vectors are unit-norm (ingest and queries), so this equals cosine
             spec=ServerlessSpec(cloud="aws", region="us-east-1"),
         )
 
+def ensure_index_for_model(pc: Pinecone, index_name: str, embed_model: str):
+    """Integrated index: Pinecone embeds the `text` field of each record server-side."""
+    indexes = [i["name"] for i in pc.list_indexes()]
+    if index_name not in indexes:
+        pc.create_index_for_model(
+            name=index_name,
+            cloud="aws",
+            region="us-east-1",
+            embed={"model": embed_model, "field_map": {"text": "text"}},
+        )
+
+def vector_id(ch: Dict, i: int) -> str:
+    return f"{ch['metadata'].get('source','doc')}#p{ch['metadata'].get('page',0)}#{i}"
+
+# Below this many chunks, spawning the encode pool costs more than it saves
+MULTI_PROCESS_MIN_CHUNKS = 2000
+
+def encode_chunks(model: SentenceTransformer, texts: List[str]):
+    """Unit-norm embeddings of the whole corpus in batched calls; large corpora fan out over a process pool."""
+    if len(texts) >= MULTI_PROCESS_MIN_CHUNKS:
+        pool = model.start_multi_process_pool()
+        try:
+            return model.encode_multi_process(texts, pool, batch_size=64, normalize_embeddings=True)
+        finally:
+            model.stop_multi_process_pool(pool)
+    # Length-sorted batches carry little padding; scatter back to the original order
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    embs = model.encode(
+        [texts[i] for i in order], batch_size=64, convert_to_numpy=True,
+        normalize_embeddings=True, show_progress_bar=False,
+    )
+    out = np.empty_like(embs)
+    out[order] = embs
+    return out
+
+def upsert_records(pc: Pinecone, index_name: str, namespace: str, chunks: List[Dict]):
+    ensure_index_for_model(pc, index_name, settings.PINECONE_EMBED_MODEL)
+    index = pc.Index(index_name)
+    records = []
+    for i, ch in enumerate(chunks):
+        ch["id"] = vector_id(ch, i)
+        records.append({"_id": ch["id"], "text": ch["content"], **ch["metadata"]})
+        if len(records) >= 96:  # upsert_records batch limit
+            index.upsert_records(namespace, records)
+            records = []
+    if records:
+        index.upsert_records(namespace, records)
+
 def upsert_chunks(chunks: List[Dict]):
     if not settings.PINECONE_API_KEY:
         raise RuntimeError("PINECONE_API_KEY not set in environment.")
@@ -76,19 +112,28 @@ def upsert_chunks(chunks: List[Dict]):
     model_name = settings.SBERT_MODEL_NAME or "sentence-transformers/all-MiniLM-L6-v2"
     namespace = settings.PINECONE_NAMESPACE or "default"
 
+    if settings.PINECONE_EMBED_MODEL:
+        upsert_records(pc, index_name, namespace, chunks)
+        return
+
     model = SentenceTransformer(model_name)
     dim = model.get_sentence_embedding_dimension()
     ensure_index(pc, index_name, dim)
     index = pc.Index(index_name)
+    if not chunks:
+        # Nothing to embed, and quantize_int8 needs a 2-D array: keep the previous store
+        return
+
+    embs = encode_chunks(model, [ch["content"] for ch in chunks])
 
     # batch upsert
     vectors = []
-    for i, ch in enumerate(chunks):
-        emb = model.encode(ch["content"]).tolist()
-        vid = f"{ch['metadata'].get('source','doc')}#p{ch['metadata'].get('page',0)}#{i}"
+    for i, (ch, emb) in enumerate(zip(chunks, embs)):
+        vid = vector_id(ch, i)
+        ch["id"] = vid  # hybrid registration keys BM25 chunks by the same id
         vectors.append({
             "id": vid,
-            "values": emb,
+            "values": emb.tolist(),
             "metadata": ch["metadata"] | {"text": ch["content"]},
         })
         if len(vectors) >= 100:
@@ -96,6 +141,7 @@ def upsert_chunks(chunks: List[Dict]):
             vectors = []
     if vectors:
         index.upsert(vectors=vectors, namespace=namespace)
+    Int8EmbeddingStore.save(INT8_EMBEDDINGS_PATH, [ch["id"] for ch in chunks], embs)
 
 def ingest_directory(pdf_dir: str):
     docs = load_pdfs(pdf_dir)
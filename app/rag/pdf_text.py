@@ -0,0 +1,39 @@
+# app/rag/pdf_text.py
+"""PDF page text for ingest. Imports only PyPDF2, so spawned extraction workers start light."""
+import os
+from typing import List, Dict
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+def infer_bank_from_name(filename: str) -> str:
+    lower = filename.lower()
+    if "axis" in lower: return "Axis Bank"
+    if "sbi" in lower or "state bank" in lower: return "State Bank of India"
+    if "hdfc" in lower: return "HDFC Bank"
+    if "icici" in lower: return "ICICI Bank"
+    if "kotak" in lower: return "Kotak Mahindra Bank"
+    return "Unknown"
+
+def extract_pdf_pages(path: str) -> List[Dict]:
+    """All non-empty pages of one PDF (runs in a worker process)."""
+    docs = []
+    try:
+        reader = PdfReader(path)
+        bank = infer_bank_from_name(os.path.basename(path))
+        for i, page in enumerate(reader.pages):
+            text = page.extract_text() or ""
+            if not text.strip():
+                continue
+            docs.append({
+                "content": text,
+                "metadata": {
+                    "source": path,
+                    "page": i + 1,
+                    "bank": bank,
+                    "title": Path(path).stem,
+                }
+            })
+    except Exception as e:
+        print(f"[ingest] Failed to read {path}: {e}")
+    return docs
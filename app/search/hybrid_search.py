@@ -2,24 +2,38 @@
 """
 Hybrid search: BM25 (lexical) + semantic (embedding) with Reciprocal Rank Fusion.
 Drop-in module. Minimal assumptions about your existing stack.
-- Lexical: rank_bm25 over chunk texts
+- Lexical: Okapi BM25 over chunk texts (Numba kernel on a CSR term layout)
 - Semantic: delegate to your existing vector store search function
 - Fusion: Reciprocal Rank Fusion (RRF)
 """
 
 from __future__ import annotations
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Sequence
 import os
 import re
-import pickle
+import heapq
+import json
+import math
+import shutil
+from collections import Counter, defaultdict
 from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
 
 # Lexical
-from rank_bm25 import BM25Okapi
+import numpy as np
+from numba import njit
 
 # Tokenization (very simple; replace with spaCy etc. if needed)
+_TOKEN_RE = re.compile(r"\w+")
+
 def _tokenize(text: str) -> List[str]:
-    return re.findall(r"\w+", (text or "").lower())
+    return _TOKEN_RE.findall((text or "").lower())
+
+@lru_cache(maxsize=4096)
+def _tokenize_query(query: str) -> Tuple[str, ...]:
+    # Hybrid and lexical calls for the same (often repeated) query share one tokenization
+    return tuple(_tokenize(query))
 
 @dataclass
 class Chunk:
@@ -27,40 +41,177 @@ class Chunk:
     text: str
     metadata: Dict
 
+# Okapi BM25 parameters (same defaults as rank_bm25.BM25Okapi)
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+# Serial on purpose: it is called from FastAPI threadpool threads, and Numba's
+# parallel threading layers are not safe to enter concurrently from several threads
+@njit(fastmath=True, cache=True)
+def _bm25_score(q_weights, idf, term_ids, tfs, doc_ptr, doc_len, avgdl, k1, b, out):
+    """out[d] = sum over the terms of doc d of q_weight * idf * tf*(k1+1) / (tf + k1*(1-b+b*dl/avgdl))"""
+    for d in range(doc_ptr.shape[0] - 1):
+        norm = k1 * (1.0 - b + b * doc_len[d] / avgdl)
+        s = 0.0
+        for j in range(doc_ptr[d], doc_ptr[d + 1]):
+            t = term_ids[j]
+            w = q_weights[t]
+            if w != 0.0:
+                tf = tfs[j]
+                s += w * idf[t] * tf * (k1 + 1.0) / (tf + norm)
+        out[d] = s
+
+# Persisted layout: one directory holding a plain .npy per array (memory-mappable),
+# meta.json (scalars) and chunks.jsonl (chunk texts/metadata, one JSON object per line)
+BM25_ARRAYS = ("vocab_keys", "term_ids", "tfs", "doc_ptr", "doc_len", "idf")
+
+def chunks_sidecar_path(persist_path: str) -> str:
+    return os.path.join(persist_path, "chunks.jsonl")
+
+def bm25_index_available(persist_path: str) -> bool:
+    # meta.json is written last, so its presence means a complete index
+    return os.path.exists(os.path.join(persist_path, "meta.json"))
+
+def load_bm25_array(persist_path: str, name: str) -> np.ndarray:
+    """Read-only memory map: pages come in on demand and are shared across workers."""
+    return np.load(os.path.join(persist_path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+
 class BM25LexicalIndex:
+    """
+    Persisted as a directory of .npy arrays (vocabulary + CSR term arrays + idf) that
+    `load` memory-maps straight into the scorer, plus meta.json and chunks.jsonl.
+    """
     def __init__(self):
-        self.bm25: Optional[BM25Okapi] = None
-        self.doc_tokens: List[List[str]] = []
         self.chunks: List[Chunk] = []
         self.id_to_idx: Dict[str, int] = {}
+        # CSR layout: doc d owns term_ids/tfs[doc_ptr[d]:doc_ptr[d+1]]
+        self.vocab: Dict[str, int] = {}
+        self.term_ids = np.empty(0, dtype=np.int32)
+        self.tfs = np.empty(0, dtype=np.float32)
+        self.doc_ptr = np.zeros(1, dtype=np.int64)
+        self.doc_len = np.empty(0, dtype=np.float32)
+        self.idf = np.empty(0, dtype=np.float32)
+        self.avgdl = 0.0
+
+    def _index(self, doc_tokens: List[List[str]]):
+        vocab: Dict[str, int] = {}
+        term_ids: List[int] = []
+        tfs: List[int] = []
+        doc_ptr = [0]
+        df: List[int] = []
+        for toks in doc_tokens:
+            for tok, tf in Counter(toks).items():
+                t = vocab.setdefault(tok, len(vocab))
+                if t == len(df):
+                    df.append(0)
+                df[t] += 1
+                term_ids.append(t)
+                tfs.append(tf)
+            doc_ptr.append(len(term_ids))
+
+        n = len(doc_tokens)
+        self.vocab = vocab
+        self.term_ids = np.asarray(term_ids, dtype=np.int32)
+        self.tfs = np.asarray(tfs, dtype=np.float32)
+        self.doc_ptr = np.asarray(doc_ptr, dtype=np.int64)
+        self.doc_len = np.asarray([len(t) for t in doc_tokens], dtype=np.float32)
+        self.avgdl = float(self.doc_len.mean()) if n else 0.0
+
+        # BM25Okapi idf: negative values (terms in more than half the docs) floor at epsilon * mean idf
+        idf = np.asarray([math.log(n - f + 0.5) - math.log(f + 0.5) for f in df], dtype=np.float64)
+        if idf.size:
+            idf[idf < 0] = BM25_EPSILON * idf.mean()
+        self.idf = idf.astype(np.float32)
+
+    def _warm(self):
+        if self.chunks:
+            # Compile (or load the cached kernel) now rather than on the first query
+            _bm25_score(np.zeros(len(self.vocab), dtype=np.float32), self.idf, self.term_ids, self.tfs,
+                        self.doc_ptr, self.doc_len, self.avgdl, BM25_K1, BM25_B,
+                        np.empty(len(self.chunks), dtype=np.float32))
 
     def build(self, chunks: List[Dict], persist_path: Optional[str] = None):
         """chunks: list of dicts with keys: id, text, metadata"""
         self.chunks = [Chunk(id=c["id"], text=c["text"], metadata=c.get("metadata", {})) for c in chunks]
-        self.doc_tokens = [_tokenize(c.text) for c in self.chunks]
-        self.bm25 = BM25Okapi(self.doc_tokens)
+        self._index([_tokenize(c.text) for c in self.chunks])
         self.id_to_idx = {c.id: i for i, c in enumerate(self.chunks)}
+        self._warm()
         if persist_path:
-            with open(persist_path, "wb") as f:
-                pickle.dump({"chunks": self.chunks, "doc_tokens": self.doc_tokens}, f)
+            self.save(persist_path)
+
+    def save(self, persist_path: str):
+        tmp_dir = f"{persist_path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        arrays = {
+            "vocab_keys": np.asarray(list(self.vocab), dtype=str),
+            "term_ids": self.term_ids,
+            "tfs": self.tfs,
+            "doc_ptr": self.doc_ptr,
+            "doc_len": self.doc_len,
+            "idf": self.idf,
+        }
+        for name in BM25_ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), arrays[name], allow_pickle=False)
+        with open(chunks_sidecar_path(tmp_dir), "w", encoding="utf-8") as f:
+            for c in self.chunks:
+                f.write(json.dumps({"id": c.id, "text": c.text, "metadata": c.metadata}, ensure_ascii=False))
+                f.write("\n")
+        # meta.json last: readers treat it as the "index complete" marker
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"avgdl": self.avgdl, "n_docs": len(self.chunks)}, f)
+
+        # Swap directories; workers still mapping the old files keep them until they exit
+        old_dir = f"{persist_path}.{os.getpid()}.old"
+        if os.path.isdir(persist_path):
+            os.rename(persist_path, old_dir)
+        os.rename(tmp_dir, persist_path)
+        shutil.rmtree(old_dir, ignore_errors=True)
 
     def load(self, persist_path: str):
-        with open(persist_path, "rb") as f:
-            data = pickle.load(f)
-        self.chunks = data["chunks"]
-        self.doc_tokens = data["doc_tokens"]
-        self.bm25 = BM25Okapi(self.doc_tokens)
+        arrays = {name: load_bm25_array(persist_path, name) for name in BM25_ARRAYS}
+        self.vocab = {tok: i for i, tok in enumerate(arrays["vocab_keys"].tolist())}
+        self.term_ids = arrays["term_ids"]
+        self.tfs = arrays["tfs"]
+        self.doc_ptr = arrays["doc_ptr"]
+        self.doc_len = arrays["doc_len"]
+        self.idf = arrays["idf"]
+        with open(os.path.join(persist_path, "meta.json"), encoding="utf-8") as f:
+            self.avgdl = float(json.load(f)["avgdl"])
+        with open(chunks_sidecar_path(persist_path), encoding="utf-8") as f:
+            self.chunks = [Chunk(**json.loads(line)) for line in f if line.strip()]
         self.id_to_idx = {c.id: i for i, c in enumerate(self.chunks)}
+        self._warm()
+
+    def chunk_by_id(self, cid: str) -> Optional[Chunk]:
+        i = self.id_to_idx.get(cid)
+        return self.chunks[i] if i is not None else None
+
+    def get_scores(self, q_tokens: Sequence[str]) -> np.ndarray:
+        # Repeated query tokens count once per occurrence, as in BM25Okapi
+        q_weights = np.zeros(len(self.vocab), dtype=np.float32)
+        for tok in q_tokens:
+            t = self.vocab.get(tok)
+            if t is not None:
+                q_weights[t] += 1.0
+        scores = np.empty(len(self.chunks), dtype=np.float32)
+        _bm25_score(q_weights, self.idf, self.term_ids, self.tfs, self.doc_ptr, self.doc_len,
+                    self.avgdl, BM25_K1, BM25_B, scores)
+        return scores
 
     def search(self, query: str, top_k: int = 20) -> List[Tuple[str, float]]:
         """Returns list of (chunk_id, score) sorted desc by score"""
-        if not self.bm25:
+        if not self.chunks:
             return []
-        q_tokens = _tokenize(query)
-        scores = self.bm25.get_scores(q_tokens)
-        # top indices
-        idxs = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
-        return [(self.chunks[i].id, float(scores[i])) for i in idxs]
+        scores = self.get_scores(_tokenize_query(query))
+        # top indices: partial select of k, then order only those
+        k = min(top_k, scores.size)
+        if k <= 0:
+            return []
+        part = np.argpartition(-scores, k - 1)[:k]
+        idxs = part[np.argsort(-scores[part], kind="stable")]
+        return [(self.chunks[i].id, float(s)) for i, s in zip(idxs.tolist(), scores[idxs].tolist())]
 
 # RRF fusion
 def reciprocal_rank_fusion(
@@ -72,79 +223,58 @@ def reciprocal_rank_fusion(
     lists: list of ranked lists; each list is [(id, score), ...] in rank order (best first).
     Returns fused list [(id, fused_score)] sorted by fused_score desc.
     """
-    rank_maps: List[Dict[str, int]] = []
-    for L in lists:
-        rank_map = {doc_id: rank for rank, (doc_id, _) in enumerate(L, start=1)}
-        rank_maps.append(rank_map)
-
-    fused: Dict[str, float] = {}
-    # Collect unique ids
-    all_ids = set()
+    # Single pass: accumulate 1/(kappa + rank) per id, then partial top-k select
+    fused: Dict[str, float] = defaultdict(float)
     for L in lists:
-        all_ids.update([doc_id for doc_id, _ in L])
-
-    for doc_id in all_ids:
-        score = 0.0
-        for rank_map in rank_maps:
-            if doc_id in rank_map:
-                r = rank_map[doc_id]
-                score += 1.0 / (kappa + r)
-        fused[doc_id] = score
-
-    ranked = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
-    return ranked
+        for rank, (doc_id, _) in enumerate(L, start=1):
+            fused[doc_id] += 1.0 / (kappa + rank)
+    return heapq.nlargest(top_k, fused.items(), key=itemgetter(1))
 
 class HybridSearch:
     """
     Plug in your existing semantic search function:
-    - pass a callable semantic_fn(query: str, top_k: int) -> List[Tuple[str, float]]
-      returning [(chunk_id, similarity_score), ...] in rank order
+    - pass a callable semantic_fn(query_or_emb, top_k: int) -> List[Tuple[str, float]]
+      returning [(chunk_id, similarity_score), ...] in rank order; it receives the
+      query embedding instead of the text when search() is given `query_emb`
     - maintain a mapping from chunk_id -> (text, metadata) via `register_chunks`
     """
     def __init__(self, semantic_fn):
         self.semantic_fn = semantic_fn
         self.lex = BM25LexicalIndex()
-        self.chunk_store: Dict[str, Chunk] = {}
 
     def register_chunks(self, chunks: List[Dict], persist_lex_to: Optional[str] = None):
         """
         chunks: [{"id": "chunk_123", "text": "...", "metadata": {...}}, ...]
         """
         self.lex.build(chunks, persist_path=persist_lex_to)
-        self.chunk_store = {c["id"]: Chunk(id=c["id"], text=c["text"], metadata=c.get("metadata", {})) for c in chunks}
 
-    def search(self, query: str, top_k: int = 10, mode: str = "hybrid") -> List[Dict]:
+    def _result(self, cid: str, score: float) -> Dict:
+        # The lexical index already holds every Chunk and an id -> position map
+        ch = self.lex.chunk_by_id(cid)
+        return {
+            "id": cid,
+            "score": score,
+            "text": ch.text if ch else "",
+            "metadata": ch.metadata if ch else {},
+        }
+
+    def search(self, query: str, top_k: int = 10, mode: str = "hybrid", query_emb=None) -> List[Dict]:
         """
         mode: "semantic" | "lexical" | "hybrid"
+        query_emb: optional precomputed query embedding, handed to semantic_fn instead of the text
         returns: list of {"id": id, "score": score, "text": text, "metadata": metadata}
         """
+        sem_query = query if query_emb is None else query_emb
         if mode == "semantic":
-            sem = self.semantic_fn(query, top_k=top_k)
-            ids = [i for (i, s) in sem]
-            return [{
-                "id": cid,
-                "score": s,
-                "text": self.chunk_store.get(cid, Chunk(cid, "", {})).text,
-                "metadata": self.chunk_store.get(cid, Chunk(cid, "", {})).metadata
-            } for cid, s in sem]
+            sem = self.semantic_fn(sem_query, top_k=top_k)
+            return [self._result(cid, s) for cid, s in sem]
 
         if mode == "lexical":
             lex = self.lex.search(query, top_k=top_k)
-            return [{
-                "id": cid,
-                "score": s,
-                "text": self.chunk_store.get(cid, Chunk(cid, "", {})).text,
-                "metadata": self.chunk_store.get(cid, Chunk(cid, "", {})).metadata
-            } for cid, s in lex]
+            return [self._result(cid, s) for cid, s in lex]
 
         # hybrid
-        sem = self.semantic_fn(query, top_k=max(top_k, 20))
+        sem = self.semantic_fn(sem_query, top_k=max(top_k, 20))
         lex = self.lex.search(query, top_k=max(top_k, 50))  # get a slightly larger pool for fusion
         fused = reciprocal_rank_fusion([sem, lex], kappa=60, top_k=top_k)
-
-        return [{
-            "id": cid,
-            "score": s,
-            "text": self.chunk_store.get(cid, Chunk(cid, "", {})).text,
-            "metadata": self.chunk_store.get(cid, Chunk(cid, "", {})).metadata
-        } for cid, s in fused]
+        return [self._result(cid, s) for cid, s in fused]
@@ -1,6 +1,6 @@
 
 from __future__ import annotations
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Sequence, Union
 import os
 
 from pinecone import Pinecone
@@ -13,16 +13,26 @@ from app.config import settings
 # and that you have a "text-embedding" function available in your stack (SentenceTransformer etc.).
 # If you already have a function elsewhere, import and use that.
 
+from app.core.embeddings import CachedEmbedder, load_embedder
+
 try:
-    from sentence_transformers import SentenceTransformer
-    _EMBEDDER = SentenceTransformer("all-MiniLM-L6-v2")  # 384-dim, fast
+    # int8 ONNX Runtime session when ONNX_EMBEDDER_DIR is set, else SentenceTransformer (384-dim, fast).
+    # Repeated queries (retries, follow-ups) hit the LRU instead of re-encoding
+    _EMBEDDER = CachedEmbedder(
+        load_embedder(
+            settings.SBERT_MODEL_NAME or "sentence-transformers/all-MiniLM-L6-v2",
+            settings.ONNX_EMBEDDER_DIR,
+            settings.ONNX_NUM_THREADS,
+        ),
+        maxsize=settings.EMBED_CACHE_SIZE,
+    )
 except Exception:
     _EMBEDDER = None
 
 def _embed(text: str):
     if _EMBEDDER is None:
-        raise RuntimeError("SentenceTransformer not available. Please install or wire your embedder.")
-    return _EMBEDDER.encode([text])[0].tolist()
+        raise RuntimeError("No embedder available. Install sentence-transformers or set ONNX_EMBEDDER_DIR.")
+    return _EMBEDDER.encode([str(text)])[0].tolist()
 
 def make_client() -> Optional[Pinecone]:
     if not settings.PINECONE_API_KEY:
@@ -30,13 +40,14 @@ def make_client() -> Optional[Pinecone]:
     return Pinecone(api_key=settings.PINECONE_API_KEY)
 
 def semantic_search(
-    query: str,
+    query_or_emb: Union[str, Sequence[float]],
     top_k: int = 20,
     index_name: Optional[str] = None,
     namespace: Optional[str] = None,
 ) -> List[Tuple[str, float]]:
     """
     Returns list of (chunk_id, score) ranked desc by score.
+    Pass an already-computed query embedding (list / np.ndarray) to skip re-embedding.
     """
     pc = make_client()
     if pc is None:
@@ -47,7 +58,7 @@ def semantic_search(
         return []
 
     index = pc.Index(index_name)
-    emb = _embed(query)
+    emb = _embed(query_or_emb) if isinstance(query_or_emb, str) else [float(x) for x in query_or_emb]
     res = index.query(
         vector=emb,
         top_k=top_k,
@@ -1,6 +1,6 @@
 
 from __future__ import annotations
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 import os
 
 from app.search.hybrid_search import HybridSearch
@@ -20,20 +20,22 @@ def register_chunks(chunks: List[Dict]):
     _CHUNKS = chunks
     _HYBRID = HybridSearch(semantic_fn=lambda q, top_k=20: semantic_search(q, top_k=top_k))
     # Persist lexical index alongside your other data
-    persist_path = os.path.join(os.path.dirname(__file__), "..", "data", "bm25_lex.pkl")
+    persist_path = os.path.join(os.path.dirname(__file__), "..", "data", "bm25_lex")
     persist_path = os.path.abspath(persist_path)
     _HYBRID.register_chunks(chunks, persist_lex_to=persist_path)
 
-def retrieve(query: str, top_k: int = 6, mode: str = "hybrid") -> List[Dict]:
+def retrieve(query: str, top_k: int = 6, mode: str = "hybrid", query_emb: Optional[Sequence[float]] = None) -> List[Dict]:
     """
     mode: "semantic" | "lexical" | "hybrid"
+    query_emb: the query's embedding if the caller already has it (e.g. get_rag_engine().embed(query));
+               the semantic leg then queries Pinecone with it instead of re-embedding.
     Returns list of chunks with text+metadata for the answer chain.
     """
     if not query:
         return []
     if _HYBRID is None:
         # Fall back to semantic only (no lexical index yet)
-        sem = semantic_search(query, top_k=top_k)
+        sem = semantic_search(query if query_emb is None else query_emb, top_k=top_k)
         # Minimal mapping to dicts
         id_to_chunk = {c["id"]: c for c in _CHUNKS}
         return [{
@@ -42,4 +44,4 @@ def retrieve(query: str, top_k: int = 6, mode: str = "hybrid") -> List[Dict]:
             "text": id_to_chunk.get(cid, {}).get("text", ""),
             "metadata": id_to_chunk.get(cid, {}).get("metadata", {})
         } for cid, s in sem]
-    return _HYBRID.search(query, top_k=top_k, mode=mode)
+    return _HYBRID.search(query, top_k=top_k, mode=mode, query_emb=query_emb)
@@ -0,0 +1,24 @@
+# gunicorn.conf.py
+# Usage: gunicorn -c gunicorn.conf.py app.main:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Visible to the app, which splits the cores across workers (ONNX_NUM_THREADS=0)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import app.main once in the master and build the RAG engine there (when_ready),
+# then fork: embedder weights, the BM25 index and chunk store are shared
+# copy-on-write instead of being loaded again by every worker.
+preload_app = True
+
+
+def when_ready(server):
+    from app.core.rag_engine import get_rag_engine
+
+    try:
+        get_rag_engine()
+    except Exception as e:
+        server.log.warning(f"RAG engine not built before fork: {e}")
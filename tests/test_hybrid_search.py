@@ -0,0 +1,97 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.search.hybrid_search import (
+    BM25_B, BM25_EPSILON, BM25_K1, BM25LexicalIndex, _tokenize, bm25_index_available,
+)
+
+CHUNKS = [
+    {"id": "axis#p1#0", "text": "Axis Bank home loan interest rate 8.75% p.a. for salaried applicants", "metadata": {"bank": "Axis Bank"}},
+    {"id": "sbi#p1#1", "text": "SBI home loan processing fee and interest rate for women borrowers", "metadata": {"bank": "State Bank of India"}},
+    {"id": "hdfc#p2#2", "text": "HDFC documents: income proof, identity proof, property papers", "metadata": {"bank": "HDFC Bank"}},
+    {"id": "icici#p3#3", "text": "ICICI home loan prepayment charges: nil for floating rate loans", "metadata": {"bank": "ICICI Bank"}},
+    {"id": "kotak#p1#4", "text": "Kotak home loan balance transfer with top up loan", "metadata": {"bank": "Kotak Mahindra Bank"}},
+]
+
+QUERIES = [
+    "home loan interest rate",            # 'home'/'loan' are in most docs: epsilon-floored idf
+    "loan loan rate",                     # repeated query tokens count per occurrence
+    "income proof documents",
+    "prepayment charges floating",
+    "unknown words only",
+]
+
+
+def reference_scores(corpus, query):
+    """Okapi BM25 exactly as rank_bm25.BM25Okapi computes it."""
+    n = len(corpus)
+    avgdl = sum(len(d) for d in corpus) / n
+    df = Counter(tok for d in corpus for tok in set(d))
+    idf = {t: math.log(n - f + 0.5) - math.log(f + 0.5) for t, f in df.items()}
+    floor = BM25_EPSILON * sum(idf.values()) / len(idf)
+    idf = {t: (floor if v < 0 else v) for t, v in idf.items()}
+    scores = []
+    for d in corpus:
+        tf = Counter(d)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(d) / avgdl)
+        scores.append(sum(idf.get(q, 0.0) * tf[q] * (BM25_K1 + 1) / (tf[q] + norm) for q in query))
+    return np.asarray(scores)
+
+
+@pytest.fixture
+def corpus():
+    return [_tokenize(c["text"]) for c in CHUNKS]
+
+
+@pytest.fixture
+def built(tmp_path):
+    index = BM25LexicalIndex()
+    index.build(CHUNKS, persist_path=str(tmp_path / "bm25_lex"))
+    return index
+
+
+@pytest.fixture
+def loaded(built, tmp_path):
+    path = str(tmp_path / "bm25_lex")
+    assert bm25_index_available(path)
+    index = BM25LexicalIndex()
+    index.load(path)
+    return index
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_scores_match_reference(built, loaded, corpus, query):
+    expected = reference_scores(corpus, _tokenize(query))
+    np.testing.assert_allclose(built.get_scores(_tokenize(query)), expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(loaded.get_scores(_tokenize(query)), expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_scores_match_rank_bm25(loaded, corpus, query):
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    expected = rank_bm25.BM25Okapi(corpus, k1=BM25_K1, b=BM25_B, epsilon=BM25_EPSILON).get_scores(_tokenize(query))
+    np.testing.assert_allclose(loaded.get_scores(_tokenize(query)), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_load_memory_maps_arrays(loaded):
+    for arr in (loaded.term_ids, loaded.tfs, loaded.doc_ptr, loaded.doc_len, loaded.idf):
+        assert isinstance(arr, np.memmap)
+    assert loaded.chunk_by_id("hdfc#p2#2").metadata == {"bank": "HDFC Bank"}
+    assert loaded.chunk_by_id("missing") is None
+
+
+def test_search_ranks_like_reference(built, loaded, corpus):
+    query = "home loan interest rate"
+    expected = reference_scores(corpus, _tokenize(query))
+    order = np.argsort(-expected, kind="stable")[:3]
+    for index in (built, loaded):
+        hits = index.search(query, top_k=3)
+        assert [cid for cid, _ in hits] == [CHUNKS[i]["id"] for i in order]
+        np.testing.assert_allclose([s for _, s in hits], expected[order], rtol=1e-5)
+
+
+def test_search_empty_index():
+    assert BM25LexicalIndex().search("home loan") == []
@@ -0,0 +1,45 @@
+import pytest
+
+from app.core.security import PIIRedactor, verhoeff_valid
+
+# 2363 is the textbook Verhoeff example; the Aadhaar-shaped numbers end in their check digit
+VALID_AADHAAR = "234123412346"
+
+
+@pytest.fixture
+def redactor():
+    return PIIRedactor()
+
+
+def test_verhoeff_check_digit():
+    assert verhoeff_valid("2363")
+    assert not verhoeff_valid("2364")
+    assert verhoeff_valid(VALID_AADHAAR)
+    assert not verhoeff_valid("234123412345")
+
+
+def test_pan_is_redacted(redactor):
+    assert redactor.redact_text("My PAN is ABCDE1234F.") == "My PAN is [PAN REDACTED]."
+
+
+@pytest.mark.parametrize("aadhaar", [VALID_AADHAAR, "2341 2341 2346", "2341-2341-2346", "499123456783"])
+def test_aadhaar_is_redacted(redactor, aadhaar):
+    assert redactor.redact_text(f"Aadhaar {aadhaar} on file") == "Aadhaar [AADHAAR REDACTED] on file"
+    assert redactor.contains_pii(aadhaar)
+
+
+@pytest.mark.parametrize("text", [
+    "loan of 250000000000 rupees",
+    "account 2341 2341 2345",
+    "reference 123412341234",     # starts with 1: never an Aadhaar
+    "EMI of ₹27,964 for 240 months at 9.5% p.a.",
+    "pan abcde1234f in lower case",
+])
+def test_non_pii_numbers_are_kept(redactor, text):
+    assert redactor.redact_text(text) == text
+    assert not redactor.contains_pii(text)
+
+
+def test_mixed_text(redactor):
+    text = f"PAN ABCDE1234F, Aadhaar {VALID_AADHAAR}, loan 250000000000"
+    assert redactor.redact_text(text) == "PAN [PAN REDACTED], Aadhaar [AADHAAR REDACTED], loan 250000000000"